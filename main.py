@@ -1,14 +1,17 @@
+import asyncio
 import os
 import logging
+import random
 import sys
+import time
 from dotenv import load_dotenv
 
+# Load environment variables once, before logging and config are set up
+load_dotenv()
+
 # Setup logging first, before any other imports
 def setup_logging():
     """Setup logging configuration from environment variables"""
-    # Load environment variables first
-    load_dotenv()
-    
     # Get log level from environment variable
     log_level = os.getenv("LOG_LEVEL", "ERROR").upper()
     
@@ -41,20 +44,6 @@ def setup_logging():
         if isinstance(handler, logging.StreamHandler):
             handler.setStream(sys.stdout)
     
-    # Force flush to ensure logs are written
-    sys.stdout.flush()
-    sys.stderr.flush()
-    
-    # Test logging configuration
-    test_logger = logging.getLogger('test')
-    test_logger.info("Logging system initialized successfully")
-    test_logger.warning("Warning logging enabled")
-    test_logger.error("Error logging enabled")
-    
-    # Force flush again
-    sys.stdout.flush()
-    sys.stderr.flush()
-    
     # Configure telegram library logging
     # For production (ERROR), disable telegram debug logs
     # For development (DEBUG/INFO), allow telegram logs
@@ -71,22 +60,20 @@ def setup_logging():
 current_log_level = setup_logging()
 logger = logging.getLogger(__name__)
 
-# Test logging configuration
-logger.info("Logging system initialized")
-logger.debug("Debug logging enabled")
-logger.warning("Warning logging enabled")
-logger.error("Error logging enabled")
-
-# Force flush to ensure logs are written
-sys.stdout.flush()
-sys.stderr.flush()
 
+from telegram.error import BadRequest, NetworkError
+from telegram.request import HTTPXRequest
 from telegram.ext import Application, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 
 # Import modules
 from modules.handlers.core.conversation import create_conversation_handler
 from modules import localization  # noqa: F401 - ensure localization patches are loaded
-from modules.config import API_COOKIES
+from modules.config import (
+    API_COOKIES, API_TOKEN, BOT_TOKEN, ADMIN_USER_IDS, LOG_LEVEL, ENVIRONMENT, POLL_INTERVAL
+)
+from modules.api.client import close_client
+
+MAX_POLLING_RESTARTS = 5
 
 
 async def handle_global_error(update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -101,25 +88,23 @@ async def handle_global_error(update, context: ContextTypes.DEFAULT_TYPE) -> Non
         logger.error(f"Failed to notify user about error: {send_error}")
 
 
+async def shutdown_api_client(application: Application) -> None:
+    """Close the shared Remnawave API client on shutdown."""
+    await close_client()
+
+
 def main():
-    # Load environment variables
-    load_dotenv()
-    
     logger.info("Starting RemnaWave Telegram Bot...")
     
     # Check if required environment variables are set
-    api_token = os.getenv("REMNAWAVE_API_TOKEN")
+    api_token = API_TOKEN
     has_cookies = bool(API_COOKIES)
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    admin_user_ids = [int(id) for id in os.getenv("ADMIN_USER_IDS", "").split(",") if id]
+    bot_token = BOT_TOKEN
+    admin_user_ids = ADMIN_USER_IDS
     
-    logger.info(f"Environment: {os.getenv('ENVIRONMENT', 'unknown')}")
-    logger.info(f"Log level: {os.getenv('LOG_LEVEL', 'ERROR')}")
-    logger.info(f"Admin user IDs: {admin_user_ids}")
-    
-    # Force flush to ensure logs are written
-    sys.stdout.flush()
-    sys.stderr.flush()
+    logger.info(f"Environment: {ENVIRONMENT}")
+    logger.info(f"Log level: {LOG_LEVEL}")
+    logger.info(f"Admin user IDs: {sorted(admin_user_ids)}")
 
     if not api_token and not has_cookies:
         logger.error("Configure REMNAWAVE_API_TOKEN or REMNAWAVE_COOKIES to allow the bot to access the panel API")
@@ -138,7 +123,25 @@ def main():
         return
     # Create the Application
     logger.info("Creating Telegram Application...")
-    application = Application.builder().token(bot_token).build()
+    # Separate pools: long polling keeps one connection busy, so outgoing
+    # sendMessage/editMessage calls get their own larger pool
+    request = HTTPXRequest(
+        connection_pool_size=32,
+        read_timeout=30,
+        write_timeout=30,
+        connect_timeout=10,
+        pool_timeout=5,
+        http_version="2"
+    )
+    get_updates_request = HTTPXRequest(connection_pool_size=1, read_timeout=35)
+    application = (
+        Application.builder()
+        .token(bot_token)
+        .request(request)
+        .get_updates_request(get_updates_request)
+        .post_shutdown(shutdown_api_client)
+        .build()
+    )
     logger.info("Telegram Application created successfully")
     
     # Cache cleanup will be handled automatically by the cache TTL mechanism
@@ -153,46 +156,38 @@ def main():
     # Global error handler
     application.add_error_handler(handle_global_error)
     
-    # Run polling with retry logic
-    max_retries = 10
-    retry_count = 0
-    
-    while retry_count < max_retries:
+    logger.info("Bot configuration:")
+    logger.info(f"  - Poll interval: {POLL_INTERVAL}s")
+    logger.info(f"  - Timeout: 30s")
+    logger.info(f"  - Bootstrap retries: 5")
+    logger.info(f"  - Drop pending updates: True")
+
+    # PTB retries bootstrap and getUpdates network errors itself; only restart
+    # polling on network failures and let configuration errors (InvalidToken,
+    # Forbidden, BadRequest, ...) propagate immediately
+    for restart in range(MAX_POLLING_RESTARTS + 1):
         try:
-            logger.info(f"Starting bot polling (attempt {retry_count + 1}/{max_retries})")
-            logger.info("Bot configuration:")
-            logger.info(f"  - Poll interval: 0.5s")
-            logger.info(f"  - Timeout: 30s")
-            logger.info(f"  - Bootstrap retries: 5")
-            logger.info(f"  - Drop pending updates: True")
-            
-            # Run polling - production configuration
+            logger.info("Starting bot polling")
+            # Long polling: Telegram holds getUpdates open for up to `timeout` seconds
+            # and answers as soon as an update arrives, so no extra delay is needed
             application.run_polling(
-                poll_interval=0.5,
+                poll_interval=POLL_INTERVAL,
                 timeout=30,
                 bootstrap_retries=5,
-                read_timeout=30,
-                write_timeout=30,
-                connect_timeout=30,
-                pool_timeout=30,
                 drop_pending_updates=True
             )
-            logger.info("Bot polling started successfully")
-            break  # If successful, exit the retry loop
-        except Exception as e:
-            retry_count += 1
-            logger.error(f"Error during polling (attempt {retry_count}/{max_retries}): {e}")
-            logger.error(f"Exception type: {type(e).__name__}")
-            
-            if retry_count >= max_retries:
-                logger.error(f"Max retries reached. Bot failed to start after {max_retries} attempts.")
+            return
+        except BadRequest:
+            raise
+        except NetworkError as e:
+            if restart >= MAX_POLLING_RESTARTS:
+                logger.error(f"Polling failed after {MAX_POLLING_RESTARTS} restarts: {e}")
                 raise
-            
-            # Wait before retrying
-            import time
-            wait_time = min(30 * retry_count, 300)  # Exponential backoff, max 5 minutes
-            logger.info(f"Waiting {wait_time} seconds before retry...")
+            wait_time = min(5 * 2 ** restart, 300) + random.uniform(0, 5)
+            logger.error(f"Network error during polling: {e}. Restarting in {wait_time:.0f} seconds...")
             time.sleep(wait_time)
+            # run_polling closes its event loop on exit
+            asyncio.set_event_loop(asyncio.new_event_loop())
 
 if __name__ == '__main__':
     try:
@@ -1,47 +1,201 @@
 import httpx
+import orjson
 import logging
 import asyncio
-from modules.config import API_BASE_URL, API_TOKEN, API_COOKIES, API_TIMEOUT, API_VERIFY_SSL, API_PREFLIGHT
+import random
+import time
+from contextlib import asynccontextmanager
+from modules.config import (
+    API_BASE_URL_CLEAN, API_TOKEN, API_COOKIES, API_TIMEOUT, API_VERIFY_SSL, API_PREFLIGHT, API_PREFLIGHT_CACHE_SECONDS,
+    API_ETAG_CACHE_TTL, API_ETAG_CACHE_SIZE,
+    HTTPX_MAX_CONNECTIONS, HTTPX_MAX_KEEPALIVE, HTTPX_KEEPALIVE_EXPIRY
+)
 
 logger = logging.getLogger(__name__)
 
-def get_headers():
-    """Get headers for API requests"""
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-        "User-Agent": "RemnaBot/1.1",
-        "Connection": "close"
-    }
-    if API_TOKEN:
-        headers["Authorization"] = f"Bearer {API_TOKEN}"
-    return headers
-
-def get_client_kwargs():
-    """Get httpx client configuration"""
-    client_kwargs = {
-        "timeout": API_TIMEOUT,  # Reduced timeout for faster failure detection
-        "verify": API_VERIFY_SSL,  # Enable SSL verification for HTTPS
-        "headers": get_headers(),
-        # More conservative connection limits to prevent exhaustion
-        "limits": httpx.Limits(
-            max_keepalive_connections=2, 
-            max_connections=5, 
-            keepalive_expiry=10  # Shorter keepalive to prevent stale connections
-        ),
-        # Force HTTP/1.1 for better compatibility
-        "http2": False,
-        # SSL configuration for HTTPS
-        "cert": None,  # No client certificate
-        "trust_env": False  # Don't use environment variables for proxy settings
-    }
-
-
-    if API_COOKIES:
-        client_kwargs["cookies"] = API_COOKIES
-        logger.debug("Configured API cookies: %s", ", ".join(API_COOKIES.keys()))
-
-    return client_kwargs
+try:
+    import h2  # noqa: F401 - required by httpx for HTTP/2
+    _h2_installed = True
+except ImportError:
+    _h2_installed = False
+# httpx negotiates HTTP/2 only via TLS ALPN (no h2c), so plain http:// stays on HTTP/1.1
+_http2_ok = _h2_installed and API_BASE_URL_CLEAN.lower().startswith("https://")
+# Set once a response arrives over HTTP/2; after that protocol errors are
+# treated as ordinary connection failures rather than missing HTTP/2 support
+_http2_confirmed = False
+
+# Headers for API requests
+HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json",
+    "User-Agent": "RemnaBot/1.1"
+}
+if API_TOKEN:
+    HEADERS["Authorization"] = f"Bearer {API_TOKEN}"
+
+# httpx client configuration; HTTP/2 is passed separately so it can be switched off
+CLIENT_KWARGS = {
+    "timeout": API_TIMEOUT,  # Reduced timeout for faster failure detection
+    "verify": API_VERIFY_SSL,  # Enable SSL verification for HTTPS
+    "headers": HEADERS,
+    # Pool sized for concurrent handlers; keepalive outlives short idle gaps
+    "limits": httpx.Limits(
+        max_keepalive_connections=HTTPX_MAX_KEEPALIVE,
+        max_connections=HTTPX_MAX_CONNECTIONS,
+        keepalive_expiry=HTTPX_KEEPALIVE_EXPIRY
+    ),
+    # SSL configuration for HTTPS
+    "cert": None,  # No client certificate
+    "trust_env": False  # Don't use environment variables for proxy settings
+}
+if API_COOKIES:
+    CLIENT_KWARGS["cookies"] = API_COOKIES
+    logger.debug("Configured API cookies: %s", ", ".join(API_COOKIES.keys()))
+
+# Shared client so keep-alive connections are reused between requests
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+# Requests in flight per client, so a replaced client is closed only once idle
+_client_users: dict[httpx.AsyncClient, int] = {}
+# Monotonic time of the last successful response; recent success skips the preflight
+_last_ok_ts: float = 0.0
+
+async def get_client() -> httpx.AsyncClient:
+    """Return the shared httpx client, creating it for the running event loop"""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # A client bound to a different (or closed) loop cannot be reused;
+        # HTTP/2 multiplexes concurrent requests over one connection
+        _client = httpx.AsyncClient(http2=_http2_ok, **CLIENT_KWARGS)
+        _client_loop = loop
+    return _client
+
+@asynccontextmanager
+async def _borrow_client():
+    """Use the shared client for one request; a client replaced meanwhile is closed by its last user"""
+    client = await get_client()
+    _client_users[client] = _client_users.get(client, 0) + 1
+    try:
+        yield client
+    finally:
+        _client_users[client] -= 1
+        if not _client_users[client]:
+            del _client_users[client]
+            if client is not _client and not client.is_closed:
+                await client.aclose()
+
+def _note_http_version(response: httpx.Response):
+    """Remember that the server answered over HTTP/2"""
+    global _http2_confirmed
+    if response.http_version == "HTTP/2":
+        _http2_confirmed = True
+
+async def _disable_http2():
+    """Fall back to HTTP/1.1 and drop the shared client so it is rebuilt"""
+    global _http2_ok, _client, _client_loop
+    _http2_ok = False
+    logger.warning("HTTP/2 protocol error before any HTTP/2 response, falling back to HTTP/1.1")
+    # Requests still running on the old client keep it open until they finish
+    client, _client, _client_loop = _client, None, None
+    if client is not None and client not in _client_users and not client.is_closed:
+        await client.aclose()
+
+async def close_client():
+    """Close the shared httpx client"""
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+def _mark_ok():
+    """Remember that the API answered successfully"""
+    global _last_ok_ts
+    _last_ok_ts = time.monotonic()
+
+# GET responses by (endpoint, params): (expires_at, etag, raw body)
+_etag_cache: dict[tuple, tuple[float, str, bytes]] = {}
+
+def _etag_key(endpoint, params) -> tuple | None:
+    """Cache key for a GET request, or None if params are not hashable"""
+    try:
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+def _etag_lookup(key) -> tuple[str, bytes] | None:
+    """Return (etag, body) for a cached GET response that has not expired"""
+    entry = _etag_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        _etag_cache.pop(key, None)
+        return None
+    return entry[1], entry[2]
+
+def _etag_store(key, etag: str, body: bytes):
+    """Remember a GET response body together with its ETag"""
+    now = time.monotonic()
+    _etag_cache.pop(key, None)
+    if len(_etag_cache) >= API_ETAG_CACHE_SIZE:
+        for stale_key in [k for k, v in _etag_cache.items() if v[0] <= now]:
+            del _etag_cache[stale_key]
+        # Still full: drop the oldest entries
+        while len(_etag_cache) >= API_ETAG_CACHE_SIZE:
+            del _etag_cache[next(iter(_etag_cache))]
+    _etag_cache[key] = (now + API_ETAG_CACHE_TTL, etag, body)
+
+# Distinguishes a missing key from a key explicitly set to None
+_SENTINEL = object()
+
+_ERROR_LABELS = (
+    (httpx.ConnectError, "Ошибка подключения"),
+    (httpx.TimeoutException, "Превышено время ожидания"),
+    (httpx.RemoteProtocolError, "Ошибка протокола"),
+)
+
+def _error_label(error: Exception) -> str:
+    """Human-readable label for a request failure"""
+    for error_type, label in _ERROR_LABELS:
+        if isinstance(error, error_type):
+            return label
+    return "Неожиданная ошибка"
+
+MAX_BACKOFF = 8.0
+MAX_RETRY_AFTER = 60.0
+# Client errors that are worth retrying
+RETRYABLE_CLIENT_STATUSES = {408, 429}
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """Delay requested by a Retry-After header, in seconds"""
+    value = response.headers.get("retry-after")
+    try:
+        return min(max(float(value), 0.0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
+
+async def _retry_sleep(attempt: int, label: str, wait_time: float | None = None):
+    """Wait with jittered exponential backoff before the next attempt"""
+    if wait_time is None:
+        # Jitter keeps concurrent callers from retrying in lock-step
+        wait_time = min(0.5 * (2 ** attempt) + random.uniform(0, 0.5), MAX_BACKOFF)
+    logger.info(f"{label}, повторная попытка через {wait_time:.1f} секунд...")
+    await asyncio.sleep(wait_time)
+
+# Upper bound on concurrent fan-out API requests (per-profile lookups etc.)
+REQUEST_CONCURRENCY = 10
+
+async def gather_limited(coros, limit: int = REQUEST_CONCURRENCY) -> list:
+    """Run coroutines concurrently (at most `limit` at a time), returning results or exceptions in order"""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros), return_exceptions=True)
 
 class RemnaAPI:
     """API client for Remnawave API using httpx"""
@@ -50,16 +204,19 @@ class RemnaAPI:
     async def _test_connection():
         """Test basic connectivity to the API server"""
         try:
-            # Используем известный рабочий эндпоинт для проверки подключения
-            url = f"{API_BASE_URL.rstrip('/')}/users"
-            client_kwargs = get_client_kwargs()
-            
-            async with httpx.AsyncClient(**client_kwargs) as client:
+            # Лёгкий эндпоинт здоровья вместо выгрузки списка пользователей
+            url = f"{API_BASE_URL_CLEAN}/system/health"
+            async with _borrow_client() as client:
                 response = await client.get(url, timeout=min(10.0, API_TIMEOUT), follow_redirects=True)
-                logger.debug(f"Тест подключения: статус {response.status_code}, URL: {response.url}")
-                return response.status_code == 200
+            _note_http_version(response)
+            logger.debug("Тест подключения: статус %s, URL: %s", response.status_code, response.url)
+            # 401/403 still prove the server is reachable over TCP/TLS/HTTP
+            if response.status_code < 400 or response.status_code in (401, 403):
+                _mark_ok()
+                return True
+            return False
         except Exception as e:
-            logger.debug(f"Тест подключения не прошел: {e}")
+            logger.debug("Тест подключения не прошел: %s", e)
             return False
 
     @staticmethod
@@ -68,10 +225,14 @@ class RemnaAPI:
         if not isinstance(payload, dict):
             return payload
 
-        if "response" in payload:
-            return payload.get("response")
-        if "data" in payload:
-            return payload.get("data")
+        # Remnawave wraps almost every payload in "response", so check it first
+        value = payload.get("response", _SENTINEL)
+        if value is _SENTINEL:
+            value = payload.get("data", _SENTINEL)
+        if value is not _SENTINEL:
+            if value is None:
+                logger.warning("API payload has a null response/data field: %s", payload)
+            return value
         if payload.get("success") is False and "error" in payload:
             logger.error("API error payload: %s", payload.get("error"))
             return None
@@ -80,15 +241,32 @@ class RemnaAPI:
     @staticmethod
     async def _make_request(method, endpoint, data=None, params=None, retry_count=3):
         """Make HTTP request with retry logic and proper error handling"""
-        url = f"{API_BASE_URL.rstrip('/')}/{endpoint.lstrip('/')}"
+        url = f"{API_BASE_URL_CLEAN}/{endpoint.lstrip('/')}"
         
-        logger.info(f"Making {method} request to: {url}")
-        logger.debug(f"Request params: {params}")
-        logger.debug(f"Request data: {data}")
+        logger.info("Making %s request to: %s", method, url)
+        logger.debug("Request params: %s", params)
+        logger.debug("Request data: %s", data)
+
+        # Pre-encoded body; Content-Type: application/json comes from HEADERS
+        content = None
+        if method.upper() in ['POST', 'PATCH', 'PUT'] and data is not None:
+            try:
+                # Non-str keys are stringified, as json.dumps did
+                content = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+            except (orjson.JSONEncodeError, TypeError) as e:
+                logger.error(f"Не удалось сериализовать тело запроса для {url}: {e}")
+                return None
+
+        etag_key = None
+        if API_ETAG_CACHE_TTL > 0 and API_ETAG_CACHE_SIZE > 0 and method.upper() == 'GET':
+            etag_key = _etag_key(endpoint, params)
         
         for attempt in range(retry_count):
             try:
-                if API_PREFLIGHT and attempt == 0:
+                if (
+                    API_PREFLIGHT and attempt == 0
+                    and time.monotonic() - _last_ok_ts >= API_PREFLIGHT_CACHE_SECONDS
+                ):
                     if not await RemnaAPI._test_connection():
                         logger.warning("Тест подключения не прошел, запрос отменен")
                         if retry_count <= 1:
@@ -98,68 +276,65 @@ class RemnaAPI:
                         await asyncio.sleep(wait_time)
                         continue
                 
-                client_kwargs = get_client_kwargs()
-                logger.debug(f"Client config: {client_kwargs}")
+                request_kwargs = {
+                    'url': url,
+                    'params': params
+                }
                 
-                async with httpx.AsyncClient(**client_kwargs) as client:
-                    request_kwargs = {
-                        'url': url,
-                        'params': params
-                    }
-                    
-                    if method.upper() in ['POST', 'PATCH', 'PUT'] and data is not None:
-                        request_kwargs['json'] = data
-                    
+                if content is not None:
+                    request_kwargs['content'] = content
+
+                cached = _etag_lookup(etag_key) if etag_key else None
+                if cached:
+                    request_kwargs['headers'] = {'If-None-Match': cached[0]}
+                
+                async with _borrow_client() as client:
                     response = await client.request(method, follow_redirects=True, **request_kwargs)
-                    
-                    logger.debug(f"Response status: {response.status_code}")
-                    logger.debug(f"Response headers: {dict(response.headers)}")
-                    
-                    # Проверка статуса ответа
-                    if response.status_code >= 500:
-                        logger.warning(f"Ошибка сервера {response.status_code}, повторная попытка...")
-                        if attempt < retry_count - 1:
-                            await asyncio.sleep(2 ** attempt)
-                            continue
-                    
-                    response.raise_for_status()
+                _note_http_version(response)
 
-                    if response.status_code in (204, 205):
-                        return None
-                    
-                    # Проверка Content-Type
-                    content_type = response.headers.get('content-type', '')
-                    if 'application/json' not in content_type.lower():
-                        logger.error(f"Ожидался JSON, получен {content_type}. Ответ: {response.text[:500]}")
-                        return None
-                    
-                    # Парсинг JSON
-                    if not response.text.strip():
-                        logger.warning("Получен пустой ответ")
-                        return None
-                    
-                    json_response = response.json()
-                    return RemnaAPI._unwrap_response_payload(json_response)
-                        
-            except httpx.ConnectError as e:
-                logger.error(f"Ошибка подключения на попытке {attempt + 1}: {str(e)}")
-                if attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"Повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Не удалось подключиться после {retry_count} попыток")
+                if cached and response.status_code == 304:
+                    _mark_ok()
+                    logger.debug("Not modified, using cached response for %s", url)
+                    return RemnaAPI._unwrap_response_payload(orjson.loads(cached[1]))
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Response status: %s", response.status_code)
+                    logger.debug("Response headers: %s", dict(response.headers))
+                
+                # Проверка статуса ответа
+                if response.status_code >= 500:
+                    logger.warning(f"Ошибка сервера {response.status_code}, повторная попытка...")
+                    if attempt < retry_count - 1:
+                        await _retry_sleep(attempt, "Ошибка сервера")
+                        continue
+                
+                response.raise_for_status()
+                _mark_ok()
+
+                if response.status_code in (204, 205):
                     return None
-                    
-            except httpx.TimeoutException as e:
-                logger.error(f"Превышено время ожидания на попытке {attempt + 1}: {str(e)}")
-                if attempt < retry_count - 1:
-                    wait_time = min(2 ** attempt, 10)
-                    logger.info(f"Повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Превышено время ожидания после {retry_count} попыток")
+                
+                body = response.content
+
+                # Проверка Content-Type
+                content_type = response.headers.get('content-type', '')
+                if 'application/json' not in content_type.lower():
+                    logger.error(
+                        "Ожидался JSON, получен %s. Ответ: %s",
+                        content_type, body[:500].decode(errors="replace")
+                    )
                     return None
+                
+                # Парсинг JSON
+                if not body.strip():
+                    logger.warning("Получен пустой ответ")
+                    return None
+                
+                json_response = orjson.loads(body)
+                etag = response.headers.get('etag')
+                if etag_key and etag:
+                    _etag_store(etag_key, etag, body)
+                return RemnaAPI._unwrap_response_payload(json_response)
                     
             except httpx.HTTPStatusError as e:
                 status = e.response.status_code
@@ -167,52 +342,24 @@ class RemnaAPI:
                     logger.info(f"HTTP 404 для {url}: {e.response.text}")
                     return None
                 logger.error(f"HTTP ошибка {status}: {e.response.text}")
-                if status >= 500 and attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"Ошибка сервера, повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
+                retryable = status >= 500 or status in RETRYABLE_CLIENT_STATUSES
+                if retryable and attempt < retry_count - 1:
+                    wait_time = _retry_after(e.response) if status == 429 else None
+                    await _retry_sleep(attempt, f"HTTP {status}", wait_time)
                 else:
                     return None
-                    
-            except httpx.RemoteProtocolError as e:
-                logger.error(f"Ошибка протокола на попытке {attempt + 1}: {str(e)}")
-                if attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"Ошибка протокола, повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Ошибка протокола после {retry_count} попыток")
-                    return None
-                    
-            except httpx.ConnectTimeout as e:
-                logger.error(f"Таймаут подключения на попытке {attempt + 1}: {str(e)}")
-                if attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"Таймаут подключения, повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Таймаут подключения после {retry_count} попыток")
-                    return None
-                    
-            except httpx.ReadTimeout as e:
-                logger.error(f"Таймаут чтения на попытке {attempt + 1}: {str(e)}")
-                if attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"Таймаут чтения, повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.error(f"Таймаут чтения после {retry_count} попыток")
-                    return None
-                    
+
             except Exception as e:
-                logger.error(f"Неожиданная ошибка на попытке {attempt + 1}: {str(e)}")
-                logger.debug(f"Тип исключения: {type(e).__name__}")
+                label = _error_label(e)
+                logger.error(f"{label} на попытке {attempt + 1}: {e!s} ({type(e).__name__})")
+                # Stale keep-alive disconnects also raise RemoteProtocolError, so only
+                # downgrade if HTTP/2 has never worked against this server
+                if isinstance(e, httpx.RemoteProtocolError) and _http2_ok and not _http2_confirmed:
+                    await _disable_http2()
                 if attempt < retry_count - 1:
-                    wait_time = 2 ** attempt
-                    logger.info(f"Неожиданная ошибка, повторная попытка через {wait_time} секунд...")
-                    await asyncio.sleep(wait_time)
+                    await _retry_sleep(attempt, label)
                 else:
-                    logger.error(f"Неожиданная ошибка после {retry_count} попыток")
+                    logger.error(f"{label} после {retry_count} попыток")
                     return None
         
         return None
@@ -1,5 +1,8 @@
-from modules.api.client import RemnaAPI
+from modules.api.client import RemnaAPI, gather_limited
 from typing import List, Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class ConfigProfileAPI:
@@ -26,6 +29,11 @@ class ConfigProfileAPI:
     @staticmethod
     async def get_profile_inbounds(profile_uuid: str) -> List[Dict[str, Any]]:
         """Get inbounds for a specific config profile"""
+        return await ConfigProfileAPI.get_profile_inbounds_or_none(profile_uuid) or []
+
+    @staticmethod
+    async def get_profile_inbounds_or_none(profile_uuid: str) -> Optional[List[Dict[str, Any]]]:
+        """Get inbounds for a config profile, or None if the request failed (so callers can skip caching it)"""
         result = await RemnaAPI.get(f"config-profiles/{profile_uuid}/inbounds")
         # v208 returns { response: { total, inbounds: [...] } }
         if isinstance(result, dict):
@@ -34,8 +42,7 @@ class ConfigProfileAPI:
             resp = result.get("response")
             if isinstance(resp, dict) and "inbounds" in resp:
                 return resp.get("inbounds") or []
-            return []
-        return []
+        return None
 
     @staticmethod
     async def get_profile_users(profile_uuid: str) -> List[Dict[str, Any]]:
@@ -53,4 +60,18 @@ class ConfigProfileAPI:
             return result
         return []
 
+    @staticmethod
+    async def get_profile_users_bulk(profile_uuids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get users for several config profiles concurrently, keyed by profile UUID"""
+        profile_uuids = [str(u) for u in profile_uuids]
+        if not profile_uuids:
+            return {}
 
+        results = await gather_limited(ConfigProfileAPI.get_profile_users(u) for u in profile_uuids)
+        users_by_profile = {}
+        for profile_uuid, users in zip(profile_uuids, results):
+            if isinstance(users, Exception):
+                logger.warning(f"Failed to load users for profile {profile_uuid}: {users}")
+                continue
+            users_by_profile[profile_uuid] = users or []
+        return users_by_profile
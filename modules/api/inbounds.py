@@ -1,12 +1,130 @@
-from modules.api.client import RemnaAPI
+from modules.api.client import RemnaAPI, gather_limited
 from modules.api.users import UserAPI
 from modules.api.config_profiles import ConfigProfileAPI
+from modules.config import API_CACHE_TTL
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Optional
+import time
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
+_ACTIVE_STATUSES = frozenset({"ACTIVE", "ENABLED", "TRUE", "ON"})
+
+# Cached lookups by key: (expires_at, value); in-flight fetches are shared
+_CACHE: dict[tuple, tuple[float, Any]] = {}
+_INFLIGHT: dict[tuple, asyncio.Future] = {}
+
+async def _cached(key: tuple, fetch: Callable[[], Awaitable[Any]], ttl: float = API_CACHE_TTL):
+    """Return a cached value for `key`, fetching it once for concurrent callers"""
+    if ttl <= 0:
+        return await fetch()
+    entry = _CACHE.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    task = _INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _INFLIGHT[key] = task
+        task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    value = await asyncio.shield(task)
+    # Failed requests come back as None; don't keep them around
+    if value is not None:
+        _CACHE[key] = (time.monotonic() + ttl, value)
+    return value
+
+async def _get_profile_inbounds(profile_uuid) -> list:
+    """Cached inbounds of a config profile (failed requests are not cached)"""
+    return await _cached(
+        ("profile_inbounds", str(profile_uuid)),
+        lambda: ConfigProfileAPI.get_profile_inbounds_or_none(profile_uuid)
+    ) or []
+
+async def _get_users() -> list:
+    """Cached list of all users"""
+    async def fetch():
+        users_response = await UserAPI.get_all_users()
+        users = None
+        if isinstance(users_response, dict) and 'users' in users_response:
+            users = users_response['users']
+        elif isinstance(users_response, list):
+            users = users_response
+        # get_all_users reports failures as [], so an empty list is not cached
+        return users or None
+
+    return await _cached(("users",), fetch) or []
+
+def _user_key(user: dict):
+    """Identity of a user for de-duplication"""
+    return user.get('uuid') or user.get('username') or id(user)
+
+def _profile_uuid_of(item) -> Optional[str]:
+    """Config profile UUID referenced by a user or subscription payload"""
+    if not isinstance(item, dict):
+        return None
+    profile = item.get('configProfile')
+    return item.get('configProfileUuid') or (profile.get('uuid') if isinstance(profile, dict) else profile)
+
+def _iter_subs(user: dict):
+    """Yield a user's subscriptions from both the singular and plural fields"""
+    subscription = user.get('subscription')
+    if isinstance(subscription, dict):
+        yield subscription
+    subscriptions = user.get('subscriptions')
+    if isinstance(subscriptions, list):
+        for sub in subscriptions:
+            if isinstance(sub, dict):
+                yield sub
+
+def _user_profile_uuid(user: dict) -> Optional[str]:
+    """Resolve a user's config profile UUID, preferring subscription fields"""
+    for sub in _iter_subs(user):
+        profile_uuid = _profile_uuid_of(sub)
+        if profile_uuid:
+            return profile_uuid
+    return _profile_uuid_of(user)
+
+async def _get_active_users() -> list:
+    """Cached list of users with an active status"""
+    async def build():
+        users = await _get_users()
+        # Nothing loaded: don't cache an empty derived list either
+        if not users:
+            return None
+        return [user for user in users if InboundAPI._is_active_status(user.get('status'))]
+
+    return await _cached(("active_users",), build) or []
+
+async def _index_users_by_profile() -> dict:
+    """Active users grouped by config profile UUID (cached)"""
+    async def build():
+        if not await _get_users():
+            return None
+        index = {}
+        for user in await _get_active_users():
+            profile_uuid = _user_profile_uuid(user)
+            if profile_uuid:
+                index.setdefault(str(profile_uuid), []).append(user)
+        return index
+
+    return await _cached(("users_by_profile",), build) or {}
+
+async def _index_users_by_tag() -> dict:
+    """Active users grouped by casefolded tag (cached)"""
+    async def build():
+        if not await _get_users():
+            return None
+        index = {}
+        for user in await _get_active_users():
+            tag = str(user.get('tag') or '').strip().casefold()
+            if tag:
+                index.setdefault(tag, []).append(user)
+        return index
+
+    return await _cached(("users_by_tag",), build) or {}
+
 class InboundAPI:
     """API methods for inbound management (v208 via config profiles)"""
     @staticmethod
@@ -16,9 +134,11 @@ class InboundAPI:
             return False
         if isinstance(value, bool):
             return value
+        # Fast path: the API sends canonical upper-case statuses
+        if type(value) is str and value in _ACTIVE_STATUSES:
+            return True
         try:
-            text = str(value).strip().upper()
-            return text in {"ACTIVE", "ENABLED", "TRUE", "ON"}
+            return str(value).strip().upper() in _ACTIVE_STATUSES
         except Exception:
             return False
     
@@ -26,7 +146,7 @@ class InboundAPI:
     async def get_inbounds():
         """Get all inbounds across all config profiles"""
         # v208 exposes inbounds via config profiles
-        result = await RemnaAPI.get("config-profiles/inbounds")
+        result = await _cached(("inbounds",), lambda: RemnaAPI.get("config-profiles/inbounds"))
         # API returns { response: { total, inbounds: [...] } } which client unwraps to response
         # Our RemnaAPI already returns json['response'] when present
         if isinstance(result, dict) and 'inbounds' in result:
@@ -41,6 +161,15 @@ class InboundAPI:
     @staticmethod
     async def get_inbound_users(inbound_uuid: str):
         """Get users associated with specific inbound in v208"""
+        result = await InboundAPI._find_inbound_users(inbound_uuid)
+        return result[0] if result else []
+
+    @staticmethod
+    async def _find_inbound_users(inbound_uuid: str) -> Optional[tuple[list, bool]]:
+        """Return (users, had_unfiltered_fallback), or None if the users could not be loaded
+
+        Every user is active unless the profile users fallback ran.
+        """
         try:
             logger.info(f"Getting users for inbound {inbound_uuid}")
             # Resolve target inbound details for robust matching
@@ -51,143 +180,148 @@ class InboundAPI:
                 logger.warning(f"Failed to fetch inbounds to resolve target details: {e}")
                 target = None
 
-            def matches_inbound_ref(ref, tgt) -> bool:
-                if ref is None:
-                    return False
+            # Precompute target match keys once instead of per reference
+            tgt_uuid = str(inbound_uuid)
+            tgt_tag = tgt_port = tgt_type = None
+            if isinstance(target, dict):
+                tgt_tag = str(target.get('tag')) if target.get('tag') else None
+                tgt_type = str(target.get('type')) if target.get('type') else None
+                # some payloads use 'port' or 'listenPort'
+                raw_port = target.get('port') if target.get('port') is not None else target.get('listenPort')
+                try:
+                    tgt_port = int(raw_port) if raw_port is not None else None
+                except (TypeError, ValueError):
+                    tgt_port = None
+            can_match_by_details = bool(tgt_tag and tgt_type and tgt_port is not None)
+
+            def matches_inbound_ref(ref) -> bool:
                 # Accept direct string reference as UUID
                 if isinstance(ref, str):
-                    return str(ref) == str(inbound_uuid)
+                    return ref == tgt_uuid
                 if not isinstance(ref, dict):
                     return False
                 # Match by UUID when present
-                if str(ref.get('uuid')) == str(inbound_uuid):
+                if str(ref.get('uuid')) == tgt_uuid:
                     return True
                 # Fallback match by tag + (port or listenPort) + type if target is known
-                if tgt and isinstance(tgt, dict):
-                    try:
-                        tag_ok = (ref.get('tag') and tgt.get('tag') and str(ref.get('tag')) == str(tgt.get('tag')))
-                        # some payloads use 'port' or 'listenPort'
-                        ref_port = ref.get('port') if ref.get('port') is not None else ref.get('listenPort')
-                        tgt_port = tgt.get('port') if tgt.get('port') is not None else tgt.get('listenPort')
-                        port_ok = (ref_port is not None and tgt_port is not None and int(ref_port) == int(tgt_port))
-                        type_ok = (ref.get('type') and tgt.get('type') and str(ref.get('type')) == str(tgt.get('type')))
-                        if tag_ok and port_ok and type_ok:
-                            return True
-                    except Exception:
-                        pass
-                return False
+                if not can_match_by_details:
+                    return False
+                try:
+                    ref_tag = ref.get('tag')
+                    if not ref_tag or str(ref_tag) != tgt_tag:
+                        return False
+                    ref_type = ref.get('type')
+                    if not ref_type or str(ref_type) != tgt_type:
+                        return False
+                    ref_port = ref.get('port') if ref.get('port') is not None else ref.get('listenPort')
+                    return ref_port is not None and int(ref_port) == tgt_port
+                except Exception:
+                    return False
             # Build a set of config profile UUIDs that include this inbound
             profile_uuids_for_inbound = set()
+            # Inbound UUIDs per profile, for O(1) "does profile include inbound" checks
+            profile_inbound_uuids = {}
             try:
                 profiles = await ConfigProfileAPI.get_profiles()
-                for profile in profiles or []:
-                    profile_uuid = profile.get("uuid") or profile.get("id")
-                    if not profile_uuid:
+                profile_uuids = [
+                    profile_uuid for profile in profiles or []
+                    if (profile_uuid := profile.get("uuid") or profile.get("id"))
+                ]
+                results = await gather_limited(
+                    _get_profile_inbounds(profile_uuid) for profile_uuid in profile_uuids
+                )
+                for profile_uuid, profile_inbounds in zip(profile_uuids, results):
+                    if isinstance(profile_inbounds, Exception):
+                        logger.warning(f"Failed to get inbounds for profile {profile_uuid}: {profile_inbounds}")
                         continue
-                    try:
-                        profile_inbounds = await ConfigProfileAPI.get_profile_inbounds(profile_uuid)
-                        if any((ib.get("uuid") == inbound_uuid) for ib in (profile_inbounds or [])):
-                            profile_uuids_for_inbound.add(profile_uuid)
-                    except Exception as e:
-                        logger.warning(f"Failed to get inbounds for profile {profile_uuid}: {e}")
+                    inbound_uuids = {str(ib.get("uuid")) for ib in (profile_inbounds or []) if isinstance(ib, dict)}
+                    profile_inbound_uuids[str(profile_uuid)] = inbound_uuids
+                    if tgt_uuid in inbound_uuids:
+                        profile_uuids_for_inbound.add(str(profile_uuid))
             except Exception as e:
                 logger.warning(f"Failed to enumerate profiles for inbound mapping: {e}")
             
             # Get all users
-            users_response = await UserAPI.get_all_users()
-            if not users_response:
-                logger.warning("No users response received")
-                return []
-            
-            users = []
-            if isinstance(users_response, dict) and 'users' in users_response:
-                users = users_response['users']
-            elif isinstance(users_response, list):
-                users = users_response
-            
+            users = await _get_users()
             if not users:
                 logger.warning("No users found in response")
-                return []
+                return None
             
             logger.info(f"Found {len(users)} total users")
             
             # Filter users by active subscriptions that use this inbound
-            inbound_users = []
-            active_users = 0
+            # Keyed by user uuid/username so each user is added once
+            inbound_users: dict = {}
+            # Status is checked once per user (cached with the user list)
+            active_list = await _get_active_users()
+            active_users = len(active_list)
             users_with_subscriptions = 0
-            users_with_profile = 0
             users_with_direct_sub_inbound = 0
             users_with_matching_inbound = 0
             
-            for user in users:
-                # Check if user has active status
-                if InboundAPI._is_active_status(user.get('status')):
-                    active_users += 1
-                    # Check if user's subscription uses this inbound
-                    subscription = user.get('subscription')
-                    subscriptions = user.get('subscriptions') if isinstance(user.get('subscriptions'), list) else None
-                    # Normalize both singular and plural subscriptions
-                    subscription_items = []
-                    if subscription and isinstance(subscription, dict):
-                        subscription_items.append(subscription)
-                    if subscriptions:
-                        for s in subscriptions:
-                            if isinstance(s, dict):
-                                subscription_items.append(s)
-
-                    for sub in subscription_items:
-                        try:
-                            if InboundAPI._is_active_status(sub.get('status')):
-                                users_with_subscriptions += 1
-                            # Direct subscription-bound inbounds (array)
-                            sub_inbounds = sub.get('inbounds') or []
-                            if isinstance(sub_inbounds, list) and any(
-                                matches_inbound_ref(si, target) for si in sub_inbounds
-                            ):
-                                inbound_users.append(user)
-                                users_with_direct_sub_inbound += 1
-                                logger.info(f"Found user {user.get('username', 'unknown')} via subscription.inbounds for inbound {inbound_uuid}")
-                                subscription_items = []
-                                break
-                        except Exception:
-                            pass
-
-                    # Resolve user's config profile UUID from multiple possible fields
-                    # Try derive profile from any subscription item first
-                    config_profile_uuid = None
-                    for sub in subscription_items or [subscription or {}]:
-                        if not isinstance(sub, dict):
+            def classify(user) -> tuple[bool, str]:
+                """Return (matched, via) for a user's subscription-bound inbounds"""
+                nonlocal users_with_subscriptions
+                for sub in _iter_subs(user):
+                    try:
+                        if InboundAPI._is_active_status(sub.get('status')):
+                            users_with_subscriptions += 1
+                        # Direct subscription-bound inbounds (array)
+                        sub_inbounds = sub.get('inbounds') or []
+                        if not isinstance(sub_inbounds, list):
                             continue
-                        config_profile_uuid = (
-                            sub.get('configProfileUuid')
-                            or (sub.get('configProfile', {}) or {}).get('uuid') if isinstance(sub.get('configProfile'), dict) else sub.get('configProfile')
-                        )
-                        if config_profile_uuid:
-                            break
-                    # Fallbacks from user fields
-                    if not config_profile_uuid:
-                        config_profile_uuid = (
-                            user.get('configProfileUuid')
-                            or (user.get('configProfile', {}) or {}).get('uuid') if isinstance(user.get('configProfile'), dict) else user.get('configProfile')
+                        for si in sub_inbounds:
+                            # Fast path: most refs carry the UUID, skip the tag/port/type fallback
+                            if isinstance(si, str):
+                                if si == tgt_uuid:
+                                    return True, "subscription.inbounds"
+                            elif isinstance(si, dict) and si.get('uuid') == tgt_uuid:
+                                return True, "subscription.inbounds"
+                            elif matches_inbound_ref(si):
+                                return True, "subscription.inbounds"
+                    except Exception:
+                        pass
+                return False, ""
+
+            for user in active_list:
+                matched, via = classify(user)
+                if not matched:
+                    continue
+                inbound_users.setdefault(_user_key(user), user)
+                users_with_direct_sub_inbound += 1
+                logger.debug("Found user %s via %s for inbound %s", user.get('username', 'unknown'), via, inbound_uuid)
+
+            # Match active users by config profile: one lookup per profile instead of per user
+            user_index = await _index_users_by_profile()
+            users_with_profile = sum(len(p_users) for p_users in user_index.values())
+            for config_profile_uuid, profile_users in user_index.items():
+                # Fast path: profiles pre-computed to contain this inbound
+                profile_matches = config_profile_uuid in profile_uuids_for_inbound
+                if not profile_matches:
+                    # Verify profile inbounds when the map is empty or uncertain
+                    try:
+                        # UUIDs of mapped profiles are already checked; only refs
+                        # without a uuid need the tag/port/type comparison
+                        known_uuids = profile_inbound_uuids.get(config_profile_uuid)
+                        profile_inbounds = await _get_profile_inbounds(config_profile_uuid)
+                        profile_matches = any(
+                            matches_inbound_ref(pi) for pi in (profile_inbounds or [])
+                            if known_uuids is None or not (isinstance(pi, dict) and pi.get('uuid'))
                         )
-                    if config_profile_uuid:
-                        users_with_profile += 1
-                        # Fast path: if we pre-computed profiles containing this inbound
-                        if (profile_uuids_for_inbound and config_profile_uuid in profile_uuids_for_inbound):
-                            inbound_users.append(user)
-                            users_with_matching_inbound += 1
-                            logger.info(f"Found user {user.get('username', 'unknown')} via profile map using inbound {inbound_uuid}")
-                            continue
-                        # On-demand verify profile inbounds when map is empty or uncertain
-                        try:
-                            profile_inbounds = await ConfigProfileAPI.get_profile_inbounds(str(config_profile_uuid))
-                            if any(matches_inbound_ref(pi, target) for pi in (profile_inbounds or [])):
-                                inbound_users.append(user)
-                                users_with_matching_inbound += 1
-                                logger.info(f"Found user {user.get('username', 'unknown')} using inbound {inbound_uuid}")
-                                continue
-                        except Exception as e:
-                            logger.warning(f"Failed to verify profile {config_profile_uuid} inbounds: {e}")
+                    except Exception as e:
+                        logger.warning(f"Failed to verify profile {config_profile_uuid} inbounds: {e}")
+                if not profile_matches:
+                    continue
+                for user in profile_users:
+                    key = _user_key(user)
+                    if key in inbound_users:
+                        continue
+                    inbound_users[key] = user
+                    users_with_matching_inbound += 1
+                    logger.debug(
+                        "Found user %s via profile %s using inbound %s",
+                        user.get('username', 'unknown'), config_profile_uuid, inbound_uuid
+                    )
             
             logger.info(
                 f"User stats: {active_users} active, {users_with_subscriptions} with subscriptions, "
@@ -198,98 +332,112 @@ class InboundAPI:
             # Alternative approach: check if user has inbound directly in their data
             if not inbound_users:
                 logger.info("Trying alternative approach - checking user data directly")
-                for user in users:
-                    if InboundAPI._is_active_status(user.get('status')):
-                        # Check if user has inbound data directly
-                        user_inbounds = user.get('inbounds', [])
-                        if user_inbounds:
-                            for user_inbound in user_inbounds:
-                                if matches_inbound_ref(user_inbound, target):
-                                    inbound_users.append(user)
-                                    logger.info(f"Found user {user.get('username', 'unknown')} with direct inbound reference")
-                                    break
-                        
-                        # Check if user has activeInbounds
-                        active_inbounds = user.get('activeInbounds', [])
-                        if active_inbounds:
-                            for active_inbound in active_inbounds:
-                                if matches_inbound_ref(active_inbound, target):
-                                    inbound_users.append(user)
-                                    logger.info(f"Found user {user.get('username', 'unknown')} with activeInbound reference")
-                                    break
+                for user in active_list:
+                    # Check if user has inbound data directly
+                    user_inbounds = user.get('inbounds', [])
+                    if user_inbounds:
+                        for user_inbound in user_inbounds:
+                            if matches_inbound_ref(user_inbound):
+                                inbound_users.setdefault(_user_key(user), user)
+                                logger.debug("Found user %s with direct inbound reference", user.get('username', 'unknown'))
+                                break
+                    
+                    # Check if user has activeInbounds
+                    active_inbounds = user.get('activeInbounds', [])
+                    if active_inbounds:
+                        for active_inbound in active_inbounds:
+                            if matches_inbound_ref(active_inbound):
+                                inbound_users.setdefault(_user_key(user), user)
+                                logger.debug("Found user %s with activeInbound reference", user.get('username', 'unknown'))
+                                break
 
             # Heuristic fallback: match by tag equality (project-specific)
             if not inbound_users and isinstance(target, dict) and target.get('tag'):
                 try:
-                    t_tag = str(target.get('tag')).strip().lower()
-                    for user in users:
-                        if not InboundAPI._is_active_status(user.get('status')):
-                            continue
-                        u_tag = str(user.get('tag') or '').strip().lower()
-                        if u_tag and u_tag == t_tag:
-                            inbound_users.append(user)
+                    tag_index = await _index_users_by_tag()
+                    for user in tag_index.get(str(target.get('tag')).strip().casefold(), []):
+                        inbound_users.setdefault(_user_key(user), user)
                     logger.info(f"Heuristic tag match added {len(inbound_users)} users for inbound {inbound_uuid}")
                 except Exception as e:
                     logger.warning(f"Heuristic tag match failed: {e}")
             
             # Final fallback: use profile users endpoint if available
+            had_unfiltered_fallback = False
             if not inbound_users and profile_uuids_for_inbound:
                 try:
+                    had_unfiltered_fallback = True
                     logger.info("Trying profile users endpoint as final fallback")
-                    seen = set()
-                    for p_uuid in profile_uuids_for_inbound:
-                        try:
-                            p_users = await ConfigProfileAPI.get_profile_users(p_uuid)
-                            for u in p_users or []:
-                                if isinstance(u, dict):
-                                    u_uuid = str(u.get('uuid'))
-                                    if u_uuid and u_uuid not in seen:
-                                        inbound_users.append(u)
-                                        seen.add(u_uuid)
-                        except Exception as e:
-                            logger.warning(f"Failed to load users for profile {p_uuid}: {e}")
+                    users_by_profile = await ConfigProfileAPI.get_profile_users_bulk(list(profile_uuids_for_inbound))
+                    for p_users in users_by_profile.values():
+                        for u in p_users or []:
+                            if isinstance(u, dict):
+                                inbound_users.setdefault(_user_key(u), u)
                     logger.info(f"Profile users fallback added {len(inbound_users)} users")
                 except Exception as e:
                     logger.warning(f"Profile users fallback failed: {e}")
             
             logger.info(f"Final result: {len(inbound_users)} users found for inbound {inbound_uuid}")
-            if not inbound_users:
+            if not inbound_users and logger.isEnabledFor(logging.DEBUG):
                 try:
                     # Extra diagnostics: log available keys to identify correct linkage fields in v208
                     sample = users[:3]
                     for idx, u in enumerate(sample, 1):
                         if not isinstance(u, dict):
                             continue
-                        logger.info(f"Diag user#{idx} keys: {list(u.keys())}")
+                        logger.debug(f"Diag user#{idx} keys: {list(u.keys())}")
                         sub = u.get('subscription') or {}
                         subs = u.get('subscriptions') if isinstance(u.get('subscriptions'), list) else []
                         if isinstance(sub, dict):
-                            logger.info(f"Diag user#{idx} subscription keys: {list(sub.keys())}")
+                            logger.debug(f"Diag user#{idx} subscription keys: {list(sub.keys())}")
                             if isinstance(sub.get('configProfile'), dict):
-                                logger.info(f"Diag user#{idx} subscription.configProfile keys: {list(sub.get('configProfile').keys())}")
+                                logger.debug(f"Diag user#{idx} subscription.configProfile keys: {list(sub.get('configProfile').keys())}")
                         for jdx, s in enumerate(subs[:2], 1):
                             if isinstance(s, dict):
-                                logger.info(f"Diag user#{idx} subscriptions[{jdx}] keys: {list(s.keys())}")
+                                logger.debug(f"Diag user#{idx} subscriptions[{jdx}] keys: {list(s.keys())}")
                         if isinstance(u.get('configProfile'), dict):
-                            logger.info(f"Diag user#{idx} configProfile keys: {list(u.get('configProfile').keys())}")
+                            logger.debug(f"Diag user#{idx} configProfile keys: {list(u.get('configProfile').keys())}")
                         if isinstance(u.get('inbounds'), list) and u.get('inbounds'):
-                            logger.info(f"Diag user#{idx} inbounds[0] keys: {list(u.get('inbounds')[0].keys()) if isinstance(u.get('inbounds')[0], dict) else type(u.get('inbounds')[0]).__name__}")
+                            logger.debug(f"Diag user#{idx} inbounds[0] keys: {list(u.get('inbounds')[0].keys()) if isinstance(u.get('inbounds')[0], dict) else type(u.get('inbounds')[0]).__name__}")
                         if isinstance(u.get('activeInbounds'), list) and u.get('activeInbounds'):
-                            logger.info(f"Diag user#{idx} activeInbounds[0] keys: {list(u.get('activeInbounds')[0].keys()) if isinstance(u.get('activeInbounds')[0], dict) else type(u.get('activeInbounds')[0]).__name__}")
+                            logger.debug(f"Diag user#{idx} activeInbounds[0] keys: {list(u.get('activeInbounds')[0].keys()) if isinstance(u.get('activeInbounds')[0], dict) else type(u.get('activeInbounds')[0]).__name__}")
                 except Exception as e:
                     logger.warning(f"Diag logging failed: {e}")
-            return inbound_users
+            return list(inbound_users.values()), had_unfiltered_fallback
             
         except Exception as e:
             logger.error(f"Error getting users for inbound {inbound_uuid}: {e}")
-            return []
+            return None
     
+    @staticmethod
+    async def get_inbound_users_summary(inbound_uuid: str) -> dict:
+        """Get users of an inbound together with enabled/disabled counts (one fetch for all views)"""
+        async def build():
+            result = await InboundAPI._find_inbound_users(inbound_uuid)
+            # Errors return None so they are not cached
+            if result is None:
+                return None
+            users, had_unfiltered_fallback = result
+            # Only the profile users fallback can return inactive users
+            if had_unfiltered_fallback:
+                enabled = sum(1 for user in users if InboundAPI._is_active_status(user.get('status')))
+            else:
+                enabled = len(users)
+            return {
+                'users': users,
+                'total': len(users),
+                'enabled': enabled,
+                'disabled': len(users) - enabled
+            }
+
+        summary = await _cached(("inbound_users_summary", str(inbound_uuid)), build)
+        return summary or {'users': [], 'total': 0, 'enabled': 0, 'disabled': 0}
+
     @staticmethod
     async def get_inbound_users_count(inbound_uuid: str):
         """Get count of users associated with specific inbound"""
         try:
-            users = await InboundAPI.get_inbound_users(inbound_uuid)
-            return len(users)
+            summary = await InboundAPI.get_inbound_users_summary(inbound_uuid)
+            return summary['total']
         except Exception as e:
             logger.error(f"Error getting users count for inbound {inbound_uuid}: {e}")
             return 0
@@ -307,43 +455,56 @@ class InboundAPI:
             return None
 
     @staticmethod
-    def _is_recent(ts: Optional[datetime], minutes: int = 5) -> bool:
-        if not ts:
-            return False
+    def _parse_epoch(value) -> Optional[float]:
+        """Parse an ISO timestamp into UTC epoch seconds (naive values are treated as UTC)"""
+        # Only strings are cached: other payload values may be unhashable
+        if not isinstance(value, str):
+            return None
+        return InboundAPI._parse_epoch_str(value)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_epoch_str(value: str) -> Optional[float]:
+        ts = InboundAPI._parse_dt(value)
+        if ts is None:
+            return None
         try:
-            now = datetime.now(timezone.utc)
             if ts.tzinfo is None:
                 ts = ts.replace(tzinfo=timezone.utc)
-            return (now - ts) <= timedelta(minutes=minutes)
+            return ts.timestamp()
         except Exception:
-            return False
+            return None
 
     @staticmethod
-    async def get_inbound_online_count(inbound: dict) -> int:
-        """Simple online count - show total active users since we can't match by tags"""
+    async def get_inbound_online_count(inbound: dict, users: Optional[list] = None) -> int:
+        """Simple online count - show total active users since we can't match by tags
+
+        Pass an already loaded `users` list to avoid fetching all users again.
+        """
         try:
-            # Get all users and count online (recent activity)
-            all_resp = await UserAPI.get_all_users()
-            all_users = []
-            if isinstance(all_resp, dict) and 'users' in all_resp:
-                all_users = all_resp['users'] or []
-            elif isinstance(all_resp, list):
-                all_users = all_resp
+            all_users = users
+            if all_users is None:
+                # Get all users and count online (recent activity)
+                all_resp = await UserAPI.get_all_users()
+                all_users = []
+                if isinstance(all_resp, dict) and 'users' in all_resp:
+                    all_users = all_resp['users'] or []
+                elif isinstance(all_resp, list):
+                    all_users = all_resp
 
             if not all_users:
                 return 0
 
-            online_count = 0
-            for user in all_users:
-                # Check if user is active
-                if not InboundAPI._is_active_status(user.get('status')):
-                    continue
-                
-                # Check if user was online recently (last 5 minutes)
-                ts = InboundAPI._parse_dt(user.get('onlineAt'))
-                if InboundAPI._is_recent(ts, minutes=5):
-                    online_count += 1
-                    
+            # Active users that were online recently (last 5 minutes)
+            cutoff = time.time() - 5 * 60
+            parse_epoch = InboundAPI._parse_epoch
+            online_count = sum(
+                1 for user in all_users
+                if InboundAPI._is_active_status(user.get('status'))
+                and (online_at := parse_epoch(user.get('onlineAt'))) is not None
+                and online_at >= cutoff
+            )
+
             logger.info(f"Online users count: {online_count} (checked {len(all_users)} users)")
             return online_count
             
@@ -355,22 +516,11 @@ class InboundAPI:
     async def get_inbound_users_stats(inbound_uuid: str):
         """Get statistics of users associated with specific inbound"""
         try:
-            users = await InboundAPI.get_inbound_users(inbound_uuid)
-            
-            if not users:
-                return {
-                    'enabled': 0,
-                    'disabled': 0,
-                    'total': 0
-                }
-            
-            enabled = sum(1 for user in users if InboundAPI._is_active_status(user.get('status')))
-            disabled = len(users) - enabled
-            
+            summary = await InboundAPI.get_inbound_users_summary(inbound_uuid)
             return {
-                'enabled': enabled,
-                'disabled': disabled,
-                'total': len(users)
+                'enabled': summary['enabled'],
+                'disabled': summary['disabled'],
+                'total': summary['total']
             }
             
         except Exception as e:
@@ -2,6 +2,8 @@ import os
 from dotenv import load_dotenv
 import logging
 import json
+from functools import lru_cache
+from types import MappingProxyType
 from urllib.parse import urlparse, urlunparse
 
 # Load environment variables
@@ -10,19 +12,23 @@ load_dotenv()
 # Set up logging for config
 logger = logging.getLogger(__name__)
 
-def _parse_cookie_header(value: str) -> dict:
+# Parsers below are memoized; they return read-only mappings so callers
+# cannot modify the cached result
+@lru_cache(maxsize=8)
+def _parse_cookie_header(value: str) -> MappingProxyType:
     """Parse a raw Cookie header string into a mapping."""
     result = {}
     for part in value.split(";"):
         name, _, raw_value = part.strip().partition("=")
         if name and raw_value:
             result[name] = raw_value
-    return result
+    return MappingProxyType(result)
 
-def _load_api_cookies(raw_value: str) -> dict:
+@lru_cache(maxsize=8)
+def _load_api_cookies(raw_value: str) -> MappingProxyType:
     """Load cookie configuration supplied via environment variables."""
     if not raw_value:
-        return {}
+        return MappingProxyType({})
     try:
         parsed = json.loads(raw_value)
     except json.JSONDecodeError:
@@ -30,7 +36,9 @@ def _load_api_cookies(raw_value: str) -> dict:
         return _parse_cookie_header(raw_value)
     else:
         if isinstance(parsed, dict):
-            return {str(name): str(value) for name, value in parsed.items() if name and value is not None}
+            return MappingProxyType(
+                {str(name): str(value) for name, value in parsed.items() if name and value is not None}
+            )
         if isinstance(parsed, list):
             cookies = {}
             for item in parsed:
@@ -41,17 +49,19 @@ def _load_api_cookies(raw_value: str) -> dict:
                 if name and value is not None:
                     cookies[str(name)] = str(value)
             if cookies:
-                return cookies
+                return MappingProxyType(cookies)
         logger.error("Unsupported cookie configuration. Provide JSON object or cookie header string.")
-        return {}
+        return MappingProxyType({})
 
 _raw_cookies = os.getenv("REMNAWAVE_COOKIES") or os.getenv("COOKIES", "")
-API_COOKIES = _load_api_cookies(_raw_cookies)
+# Plain dict copy: httpx only accepts real dicts as a cookie mapping
+API_COOKIES = dict(_load_api_cookies(_raw_cookies))
 
 if _raw_cookies and not API_COOKIES:
     logger.warning("Cookie configuration is set but no valid cookies were parsed.")
 
 # API Configuration
+@lru_cache(maxsize=8)
 def _normalize_api_base_url(value: str) -> str:
     """Normalize base URL and ensure the API path exists."""
     raw = (value or "").strip()
@@ -68,53 +78,62 @@ def _normalize_api_base_url(value: str) -> str:
     return urlunparse(parsed._replace(path=path))
 
 API_BASE_URL = _normalize_api_base_url(os.getenv("API_BASE_URL", "http://remnawave:3000/api"))
+API_BASE_URL_CLEAN = API_BASE_URL.rstrip("/")
 API_TOKEN = os.getenv("REMNAWAVE_API_TOKEN")
 API_TIMEOUT = float(os.getenv("API_TIMEOUT", "30"))
 API_VERIFY_SSL = os.getenv("API_VERIFY_SSL", "true").lower() == "true"
 API_PREFLIGHT = os.getenv("API_PREFLIGHT", "false").lower() == "true"
+API_PREFLIGHT_CACHE_SECONDS = float(os.getenv("API_PREFLIGHT_CACHE_SECONDS", "30"))
+# Short-lived cache for inbound/profile lookups, in seconds; 0 disables it
+API_CACHE_TTL = float(os.getenv("API_CACHE_TTL", "15"))
+# Conditional GET (ETag) cache; 0 disables it
+API_ETAG_CACHE_TTL = float(os.getenv("API_ETAG_CACHE_TTL", "300"))
+API_ETAG_CACHE_SIZE = int(os.getenv("API_ETAG_CACHE_SIZE", "256"))
+
+# httpx connection pool settings
+HTTPX_MAX_CONNECTIONS = int(os.getenv("HTTPX_MAX_CONNECTIONS", "100"))
+HTTPX_MAX_KEEPALIVE = int(os.getenv("HTTPX_MAX_KEEPALIVE", "20"))
+HTTPX_KEEPALIVE_EXPIRY = float(os.getenv("HTTPX_KEEPALIVE_EXPIRY", "15"))
 
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "ERROR").upper()
+ENVIRONMENT = os.getenv("ENVIRONMENT", "unknown")
+# Pause between getUpdates calls; long polling (timeout=30) already waits for updates
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "0"))
+
+def _parse_id_list(raw: str, name: str) -> list[int]:
+    """Parse a comma-separated list of Telegram IDs, skipping (and logging) invalid entries."""
+    parts = [part for part in (item.strip() for item in raw.split(",")) if part]
+    ids = [int(part) for part in parts if part.removeprefix("-").isdigit()]
+    invalid = [part for part in parts if not part.removeprefix("-").isdigit()]
+    if invalid:
+        logger.error(f"Ignoring invalid {name} entries: {invalid}")
+    return ids
 
 # Parse admin user IDs with detailed logging
 admin_ids_str = os.getenv("ADMIN_USER_IDS", "")
 logger.info(f"Raw ADMIN_USER_IDS from env: '{admin_ids_str}'")
 
-ADMIN_USER_IDS = []
-if admin_ids_str:
-    try:
-        ADMIN_USER_IDS = [int(id.strip()) for id in admin_ids_str.split(",") if id.strip()]
-        logger.info(f"Parsed ADMIN_USER_IDS: {ADMIN_USER_IDS}")
-    except ValueError as e:
-        logger.error(f"Error parsing ADMIN_USER_IDS: {e}")
-        ADMIN_USER_IDS = []
+# frozenset for O(1) membership checks
+ADMIN_USER_IDS: frozenset[int] = frozenset(_parse_id_list(admin_ids_str, "ADMIN_USER_IDS"))
+if ADMIN_USER_IDS:
+    logger.info(f"Parsed ADMIN_USER_IDS: {sorted(ADMIN_USER_IDS)}")
 else:
     logger.warning("ADMIN_USER_IDS is empty or not set!")
 
 operator_ids_str = os.getenv("OPERATOR_USER_IDS", "")
 logger.info(f"Raw OPERATOR_USER_IDS from env: '{operator_ids_str}'")
 
-OPERATOR_USER_IDS = []
-if operator_ids_str:
-    try:
-        OPERATOR_USER_IDS = [int(id.strip()) for id in operator_ids_str.split(",") if id.strip()]
-        logger.info(f"Parsed OPERATOR_USER_IDS: {OPERATOR_USER_IDS}")
-    except ValueError as e:
-        logger.error(f"Error parsing OPERATOR_USER_IDS: {e}")
-        OPERATOR_USER_IDS = []
+OPERATOR_USER_IDS = _parse_id_list(operator_ids_str, "OPERATOR_USER_IDS")
+if OPERATOR_USER_IDS:
+    logger.info(f"Parsed OPERATOR_USER_IDS: {OPERATOR_USER_IDS}")
 else:
     logger.info("OPERATOR_USER_IDS is empty or not set")
 
-def _build_user_roles(admin_ids, operator_ids):
-    roles = {}
-    for admin_id in admin_ids:
-        roles[admin_id] = "admin"
-    for operator_id in operator_ids:
-        if operator_id in roles:
-            continue
-        roles[operator_id] = "operator"
-    return roles
-
-USER_ROLES = _build_user_roles(ADMIN_USER_IDS, OPERATOR_USER_IDS)
+# Admin role wins when an ID is listed in both variables
+USER_ROLES = {admin_id: "admin" for admin_id in ADMIN_USER_IDS} | {
+    operator_id: "operator" for operator_id in OPERATOR_USER_IDS if operator_id not in ADMIN_USER_IDS
+}
 AUTHORIZED_USER_IDS = list(USER_ROLES.keys())
 
 if USER_ROLES:
@@ -526,10 +526,7 @@ async def show_inbound_users(update: Update, context: ContextTypes.DEFAULT_TYPE,
     message += f"🔢 *Порт*: {inbound['port']}\n\n"
 
     try:
-        online_count = await InboundAPI.get_inbound_online_count(inbound)
-        message += f"📡 *Онлайн сейчас*: {online_count}\n\n"
-        
-        # Получим общее количество активных пользователей
+        # Один запрос пользователей и для онлайна, и для общего количества
         from modules.api.users import UserAPI
         all_users_resp = await UserAPI.get_all_users()
         all_users = []
@@ -537,7 +534,11 @@ async def show_inbound_users(update: Update, context: ContextTypes.DEFAULT_TYPE,
             all_users = all_users_resp['users'] or []
         elif isinstance(all_users_resp, list):
             all_users = all_users_resp
+
+        online_count = await InboundAPI.get_inbound_online_count(inbound, users=all_users)
+        message += f"📡 *Онлайн сейчас*: {online_count}\n\n"
         
+        # Получим общее количество активных пользователей
         active_users = 0
         for user in all_users:
             if InboundAPI._is_active_status(user.get('status')):